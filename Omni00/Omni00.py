@@ -37,9 +37,10 @@
     the hexadecimal payload and displayed correctly.
 
     The foundation for this was borrowed from the DNT code
-    (http://github.com/hdtodd/DNT) and uses threads to separate
-    data collection from data processing, which might be required
-    if you're using Python to process other sensor data.
+    (http://github.com/hdtodd/DNT), but since decoding a packet
+    takes only microseconds, messages are processed directly in
+    the MQTT 'on_message' callback rather than being handed off
+    through a queue to a separate processing thread.
     The data extraction is modeled directly from the 'omni.c'
     decoder in the rtl_433/src/devices directory of that repository.
 
@@ -96,7 +97,6 @@
 
     David Todd, HDTodd@gmail.com, 2025.06.01
 """
-import configparser
 import argparse
 import sys
 import os
@@ -105,14 +105,19 @@ import signal
 from paho.mqtt import client as mqtt_client
 import random
 import json
+# Use the faster 'orjson' parser if it's installed; it also accepts
+#   the raw bytes of the MQTT payload without decoding them first
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 from time import sleep
 import datetime
-import threading
-import requests
 from enum import IntEnum
-from queue import Queue
 from Omni00AP import AP_NAME, AP_VERSION, AP_DESCRIPTION, AP_EPILOG, AP_PATH
 from ProcessIniCli import set_ini_cli_params 
+from Omni00Core import crc8, CnvTime, DECODERS
 
 # A variable instantiated as this class will contain the operating parameters
 #   for the program.  List all operating parameters here.
@@ -136,138 +141,110 @@ tScale = "°F"
 location = {}
 
 # Variables and constants used globally
-global exit_event
-global msg_q
 global source
 global my_clk
 
+# Duplicate detection: the (device, payload) keys seen in the current
+#   'dup_thresh'-second time slot and in the one before it are kept in
+#   two sets.  When a new slot starts the sets rotate, so memory stays
+#   bounded while a repeat from any device within 'dup_thresh' seconds
+#   is always caught, however many devices are interleaved.
 dup_thresh = 2.0
-last_time  = 0
-last_dev   = ""
-
-##############################################################################
-# Convert time string (ts) from ISO format to epoch time                                 
-# Or, if ts is in epoch time, convert to timestamp format.                               
-# Return both formats for use in processing and displaying                               
-def CnvTime(ts):
-    if ts.find("-") > 0:
-        try:
-            eTime = datetime.datetime.fromisoformat(ts).timestamp()
-            timestamp = ts
-        except ValueError as e:
-            err={}
-            print("datetime error in input line converting time string: ", ts)
-            print("datetime  msg:", err.get("error", str(e)))
-            sys.exit(1)
-    else:
-        try:
-            eTime = float(ts)
-            timestamp = datetime.datetime.fromtimestamp(eTime)
-        except ValueError as e:
-            err = {}
-            print("Datetime conversion failed on line with datetime string", ts)
-            print("float() error msg:", err.get("error", str(e)))
-            sys.exit(1)
-
-    return(timestamp, eTime)
-# End CnvTime()
+dup_slot   = 0
+dup_cur    = set()
+dup_prev   = set()
 
 ###############################################################################
 # process_msg() does the real work of understanding and then presenting
-#   the data in the received message (from HTTP or MQTT)
+#   the data in the received message.  It is installed as the MQTT
+#   'on_message' callback, so it runs directly in the MQTT network loop.
 # If it's a thermometer reading:
 #   ignore if it's a duplicate, update display if it isn't
 
-def process_msg():
-    global exit_event
-    global msg_q
-    global my_clk
-    global last_dev
-    global last_time
-    global params
+def process_msg(mqtt, userdata, msg):
+    global dup_slot
+    global dup_cur
+    global dup_prev
+
+    # Try to parse the json payload from MQTT or HTTP
+    try:
+        y = json_loads(msg.payload)
+    except ValueError:
+        # Nope, can't serialize the packet                                       
+        # Write the raw bytes: the payload may not even be valid UTF-8
+        print("Unable to load JSON fields from record:\n\t", end="", flush=True)
+        sys.stdout.buffer.write(msg.payload + b"\n")
+        return
+    # Valid JSON, but not a record (e.g., a list or a bare string)
+    if not isinstance(y, dict):
+        return
+
+    # Got a real message: process it
+    # Ignore tire pressure monitoring system temp reports
+    # Most records on the rtl_433 feed are from other devices, so reject
+    #   them with a single dict.get() probe per field (a missing field
+    #   returns None and fails the comparison)
+    if y.get("type") == "TPMS":
+        return
+    model = y.get("model")
+    if model != "Omni Multisensor":
+        return
+    # 'omni.c' reports the packet format as "channel"; skip any
+    #   format we have no payload decoder for
+    #   (it may arrive as an int or as a string, so normalize it once)
+    try:
+        fmt = int(y.get("channel"))
+    except (TypeError, ValueError):
+        return
+    decode = DECODERS.get(fmt)
+    if decode is None:
+        return
+    channel = str(fmt)
+
+    #  Create the device identifier as "model/id/channel"
+    if "id" in y:
+        id = str(y["id"])
+    dev = model + "/" + id + "/" + channel
     
-    while not exit_event.is_set():
-        msg = msg_q.get()
-        # If it's a null message, that's our signal to quit                              
-        if msg == None:
-            mqtt.loop_stop()
+    # Process the record and print it out
+    (dt,eTime)  = CnvTime(y["time"])
+    payload = str(y["payload"])
+    slot    = int(eTime // dup_thresh)
+    if slot > dup_slot:
+        dup_prev = dup_cur if slot == dup_slot + 1 else set()
+        dup_cur  = set()
+        dup_slot = slot
+    key     = (dev, payload)
+    if key in dup_cur or key in dup_prev:
+        return
+    dtime   = dt.strftime("%H:%M:%S")
+    loc     = location.get(dev.lower(), dev)
+
+    b = bytes.fromhex(payload)
+
+    # 'omni.c' has already validated the CRC before publishing just the
+    #   8 data bytes, so there is only a CRC to check here if the CRC byte
+    #   was passed along after them.  In that case, rebuild the transmitted
+    #   frame: the [fmt][id] header byte is reported as the "channel" and
+    #   "id" fields, not in the payload.
+    if len(b) > 8:
+        frame = bytes([((fmt & 0x0F) << 4) | (int(y["id"]) & 0x0F)]) + b
+        if crc8(frame[:9]) != frame[9]:
             if params.debug:
-                print("Stop processing thread in 'process_msg'")
-            break
-
-        # Try to parse the json payload from MQTT or HTTP
-        try:
-            y = json.loads(msg.payload.decode())
-        except:
-            # Nope, can't serialize the packet                                       
-            print("Unable to load JSON fields from record:\n\t", end="")
-            print(msg.payload.decode())
-            continue
-
-        # Got a real message: process it
-        # Ignore tire pressure monitoring system temp reports
-        if "type" in y and y["type"]=="TPMS":
-            continue
-        # If not a device record, just return
-        if "model" not in y:
-            continue
-
-        #  Create the device identifier as "model/id/channel"
-        model = y["model"]
-        if model != "Omni Multisensor":
-            continue
-        if "channel" not in y:
-            continue
-        channel = str(y["channel"])
-        if channel != "0":
-            continue
-        if "id" in y:
-            id = str(y["id"])
-        dev = model + "/" + id + "/" + channel
-        
-        # Process the record and print it out
-        (isoTime,eTime)  = CnvTime(y["time"])
-        if (dev == last_dev) and (eTime < last_time + dup_thresh):
-            continue
-        payload = str(y["payload"])
-        dtime   = datetime.datetime.fromisoformat(y["time"]).strftime("%H:%M:%S")
-        loc     = dev if dev.lower() not in location else location[dev.lower()]
-
-        b = bytearray.fromhex(payload)
-
-        print(dtime, loc, "Payload = ", payload, " = ", end="")
-        for be in b:
-            print(hex(be), "", end="")
-        print("")
-
-#       Decoding taken FROM OMNI.C DECODER (commented lines from omni.c)
-#       Note that the payload data DOES NOT INCLUDE the first or last byte of
-#         the transmission, so b[0] from payload data is b[1] from the transmission
-#       itemp_c     = ((double)((int32_t)(((((uint32_t)b[1]) << 24) | ((uint32_t)(b[2]) & 0xF0) << 16)) >> 20)) / 10.0;
-        itemp = ( ( (b[0]<<24) | (b[1]& 0xF0)<<16 ) >> 20 ) / 10.0
-#	otemp_c     = ((double)((int32_t)(((((uint32_t)b[2]) << 28) | ((uint32_t)b[3]) << 20)) >> 20)) / 10.0;
-        otemp = ( ( ((b[1]&0x0F)<<28) | (b[2]<<20) ) >>20 ) / 10.0
-#       ihum        = (double)b[4];
-        ihum  = float(b[3])
-#       light       = (double)b[5];
-        light = float(b[4])
-#       press       = (double)(((uint16_t)(b[6] << 8)) | b[7]) / 10.0;
-        press = ( (b[5]<<8) | b[6] ) / 10.0
-#       volts       = ((double)(b[8])) / 100.0 + 3.00;
-        volts = float(b[7]) / 100.0 + 3.00
-        
-        print("\t\t\t      itemp={}℃, otemp={}℃, ihum={}%, light={}%," \
-              " press={} hPa, volts={}V" \
-              .format(itemp, otemp, int(ihum), int(light), press, volts))
-
-#        print("\t\t\t      itemp=", itemp, ", otemp=", otemp,
-#              ", ihum=", ihum, ", light=", light,
-#              ", press=", press, ", volts=",volts)
-        last_dev = dev
-        last_time = eTime
-            
-    # No return: thread exits when exit_event is set or
-    #  when a "None" message is received from the message collector
+                print("CRC8 checksum error on payload", payload, "from", dev)
+            return
+
+    # Decode the data fields packed into the payload
+    (itemp, otemp, ihum, light, press, volts) = decode(b)
+
+    # And print both output lines with a single write
+    sys.stdout.write(
+        f"{dtime} {loc} Payload = {payload} = {b.hex(' ')}\n"
+        f"\t\t\t      itemp={itemp}℃, otemp={otemp}℃, ihum={ihum}%, "
+        f"light={light}%, press={press} hPa, volts={volts}V\n")
+
+    dup_cur.add(key)
+    return
 # End process_msg()
 
 """
@@ -275,7 +252,6 @@ def process_msg():
 
 ############################################################################### 
 #  MQTT functions and message reception
-#  Message producer thread for MQTT stream                                               
 
 # Connect to  MQTT host
 def connect_mqtt() -> mqtt_client:
@@ -306,33 +282,26 @@ def connect_mqtt() -> mqtt_client:
 
 # Subscribe to rtl_433 publication & process records we receive
 def mqtt_subscribe(mqtt: mqtt_client):
-    # When we get an MQTT message, just pass it on to the
-    #   message processor to handle, as it does for HTTP as well
-    def on_message(mqtt, userdata, msg):
-        global msg_q
-        msg_q.put(msg)
-        return
-
-    mqtt.subscribe(params.topic)
-    mqtt.on_message = on_message
+    # When we get an MQTT message, process it right there in the
+    #   MQTT network loop
+    # 'topic' may be a comma-separated list so that the broker, rather
+    #   than process_msg, can filter out records from other devices
+    #   (empty entries, from a stray comma, are skipped)
+    mqtt.subscribe([(t, 0) for t in (s.strip() for s in params.topic.split(',')) if t])
+    mqtt.on_message = process_msg
     if params.debug:
         print("subscribed to mqtt feed")
-    mqtt.loop_start()
-    return #From mqtt_subscribe(), but 'on_message' is active as mqtt callback
+    return #From mqtt_subscribe(), but 'process_msg' is active as mqtt callback
 # End MQTT functions and message reception
 
 
 ##############################################################################
-# CNTL-C and QUIT button handler                                                         
+# CNTL-C, QUIT button and SIGTERM (e.g., 'systemctl stop') handler
+#   Disconnecting makes 'loop_forever()' return to the main script
 def quit_prog(signum, stack_frame):
-    global exit_event
-    global msg_q
     global mqtt
     if params.debug:
         print("Quitting from quit_prog")
-    exit_event.set()
-    msg_q.put(None)
-    mqtt.loop_stop()
     mqtt.disconnect()
     return
 
@@ -344,10 +313,9 @@ if __name__ == "__main__":
     global msg
     global source
     
-    exit_event = threading.Event()
-    msg_q = Queue(0)
     t = datetime.datetime.now()
     signal.signal(signal.SIGINT, quit_prog)
+    signal.signal(signal.SIGTERM, quit_prog)
 
     params = Parameters()
 
@@ -355,23 +323,25 @@ if __name__ == "__main__":
     # The 'config' dictionary will hold the key:value settings
     #   for all operating parameters after being set first
     #   from .ini file settings and then from command line options
-    config = configparser.ConfigParser()
-    # Set default values here
+    # Set default values here; keys must be lowercase
+    config = {}
     config['Server'] = {
         'topic' :  'rtl_433/+/events',
         'port'  :  '1883'
         }
     config['Locale'] = {
-        'degC'  :  'true'
+        'degc'  :  'true'
         }
 
     # Process the .ini file and then command-line into 'config' dictionary
     #   and set the program's operating parameters from 'config'
     set_ini_cli_params(config,params)
 
-    if 'Aliases' in config.sections():
+    # Store the alias keys in lowercase so that process_msg can match
+    #   device names case-insensitively with a single lookup
+    if 'Aliases' in config:
         for key, value in config['Aliases'].items():
-            location[key] = value
+            location[key.lower()] = value
 
     if params.debug:
         print("\nOperational parameters after .ini and cli:")
@@ -383,23 +353,13 @@ if __name__ == "__main__":
     mqtt = connect_mqtt()
 
     if params.debug:
-        print("Start treads for receiving MQTT packets and for packet processing")
-
-    # Start the consumer and producer threads.
-    #  They will be terminated by "quit_prog": CNTL-C or QUIT button
-    c = threading.Thread(target = process_msg, args=())
-    p = threading.Thread(target = mqtt_subscribe, args=(mqtt,))
-    c.start()
-    p.start()
-
-    # Exiting threads return control to here
-    p.join()
-    if params.debug:
-        print("Message collecting thread, 'subscribe', exited but processing thread continues")
+        print("Start MQTT loop for receiving and processing packets")
 
-    c.join()
+    # Receive and process messages on this thread until
+    #  "quit_prog" (CNTL-C, QUIT button or SIGTERM) disconnects us
+    mqtt.loop_forever(retry_first_connection=True)
     if params.debug:
-        print("Message processing thread, 'process_msg' exited; terminate normally")
+        print("MQTT loop exited; terminate normally")
     print("Quitting ...")
     sys.exit(0)
 
@@ -0,0 +1,118 @@
+"""
+   Per-message decoding routines for Omni00.py: CRC8 check, timestamp
+   conversion and payload field extraction.
+
+   These are kept apart from the MQTT and display code, and fully
+   type-annotated, so that this module can be compiled ahead-of-time
+   into a C extension with mypyc:
+
+       pip3 install mypy
+       python3 setup.py build_ext --inplace
+
+   Omni00.py imports the compiled extension if it has been built and
+   this plain Python module otherwise; the results are identical.
+"""
+
+import sys
+import datetime
+from typing import Final, Tuple
+
+# Masks for the 12-bit, 2's complement temperature fields
+#   (x ^ TEMP_SIGN) - TEMP_SIGN sign-extends a 12-bit field without a branch
+TEMP_MASK: Final = 0xFFF
+TEMP_SIGN: Final = 0x800
+
+##############################################################################
+# CRC8 checksum, polynomial 0x97, init 0xaa, no reflections or inversions,
+#   as used by the 'omni.c' decoder.  The 256-entry table is built once
+#   at startup so that checking a packet takes one lookup per byte rather
+#   than the 8-step shift-and-XOR loop per byte.
+def _crc_bit(byte: int, poly: int) -> int:
+    c = byte
+    for i in range(8):
+        if c & 0x80:
+            c = ((c << 1) ^ poly) & 0xFF
+        else:
+            c = (c << 1) & 0xFF
+    return c
+
+CRC8_TBL: Final = bytes(_crc_bit(i, 0x97) for i in range(256))
+
+def crc8(buf: bytes, init: int = 0xaa) -> int:
+    c = init
+    for b in buf:
+        c = CRC8_TBL[c ^ b]
+    return c
+# End crc8()
+
+##############################################################################
+# Convert time string (ts) from ISO format to epoch time
+# Or, if ts is in epoch time, convert to a datetime.
+# Return both the datetime and the epoch time for use in processing
+#   and displaying, so the time string is parsed only once
+# rtl_433 normally reports time as "YYYY-MM-DD HH:MM:SS", so build the
+#   datetime for that layout directly from its fields; anything else
+#   is left to fromisoformat()
+def CnvTime(ts: str) -> Tuple[datetime.datetime, float]:
+    if ts.find("-") > 0:
+        try:
+            if (len(ts) == 19 and ts[4] == '-' and ts[7] == '-' and ts[10] in ' T'
+                    and ts[13] == ':' and ts[16] == ':'):
+                dt = datetime.datetime(int(ts[0:4]), int(ts[5:7]), int(ts[8:10]),
+                                       int(ts[11:13]), int(ts[14:16]), int(ts[17:19]))
+            else:
+                dt = datetime.datetime.fromisoformat(ts)
+            eTime = dt.timestamp()
+        except ValueError as e:
+            err: dict = {}
+            print("datetime error in input line converting time string: ", ts)
+            print("datetime  msg:", err.get("error", str(e)))
+            sys.exit(1)
+    else:
+        try:
+            eTime = float(ts)
+            dt = datetime.datetime.fromtimestamp(eTime)
+        except ValueError as e:
+            err = {}
+            print("Datetime conversion failed on line with datetime string", ts)
+            print("float() error msg:", err.get("error", str(e)))
+            sys.exit(1)
+
+    return(dt, eTime)
+# End CnvTime()
+
+##############################################################################
+# Extract the data fields of a format 01 packet from the 8-byte payload
+# Returns (itemp, otemp, ihum, light, press, volts)
+def decode_fmt1(b: bytes) -> Tuple[float, float, int, int, float, float]:
+#       Decoding taken FROM OMNI.C DECODER (commented lines from omni.c)
+#       Note that the payload data DOES NOT INCLUDE the first or last byte of
+#         the transmission, so b[0] from payload data is b[1] from the transmission
+#       The two 12-bit temperatures are packed into the first 3 payload bytes,
+#         so pull those out as one 24-bit integer and slice the fields from it
+#       itemp_c     = ((double)((int32_t)(((((uint32_t)b[1]) << 24) | ((uint32_t)(b[2]) & 0xF0) << 16)) >> 20)) / 10.0;
+#	otemp_c     = ((double)((int32_t)(((((uint32_t)b[2]) << 28) | ((uint32_t)b[3]) << 20)) >> 20)) / 10.0;
+    w = int.from_bytes(b[0:3], 'big')
+    itemp_raw = w >> 12
+    otemp_raw = w & TEMP_MASK
+    itemp = ((itemp_raw ^ TEMP_SIGN) - TEMP_SIGN) / 10.0
+    otemp = ((otemp_raw ^ TEMP_SIGN) - TEMP_SIGN) / 10.0
+#       ihum        = (double)b[4];
+#       light       = (double)b[5];
+    ihum, light = b[3], b[4]
+#       press       = (double)(((uint16_t)(b[6] << 8)) | b[7]) / 10.0;
+    press = ( (b[5]<<8) | b[6] ) / 10.0
+#       volts       = ((double)(b[8])) / 100.0 + 3.00;
+    volts = b[7] / 100.0 + 3.00
+    return (itemp, otemp, ihum, light, press, volts)
+# End decode_fmt1()
+
+##############################################################################
+# Payload decoders, keyed by the message format ('fmt', reported by 'omni.c'
+#   as "channel").  Only format 00 messages carry a hex payload, and in this
+#   demo their payload holds format 01 data fields.  Each decoder returns
+#   (itemp, otemp, ihum, light, press, volts); add an entry here to decode
+#   another format.
+DECODERS: Final = {
+    0: decode_fmt1,
+}
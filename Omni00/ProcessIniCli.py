@@ -5,7 +5,8 @@
 
    Use:
        Create the class variable 'params' with the required variables
-       Initiate the 'config' variable for the 'configurationparser()' procedure
+       Initiate the 'config' dictionary of sections, each a dictionary of
+           lowercase key : string value default settings
        Invoke the procedure
            set_ini_cli_params(config, params)
 
@@ -16,32 +17,64 @@
 """
 
 import argparse
-import configparser, os
+import os
 from Omni00AP import AP_NAME, AP_VERSION, AP_DESCRIPTION, AP_EPILOG, AP_PATH
 
+# Values accepted as booleans in the .ini file, as in 'configparser'
+BOOLEAN_STATES = {'1': True, 'yes': True, 'true': True, 'on': True,
+                  '0': False, 'no': False, 'false': False, 'off': False}
+
+####################################################################################
+#  Read the .ini file at 'path' into a dictionary of sections, each a dictionary
+#    of key : value strings.  The file is only a handful of lines, so parse it
+#    directly rather than loading 'configparser' and its interpolation machinery.
+#  As with 'configparser', keys are lowercased, "=" or ":" separates key from
+#    value, and lines starting with "#" or ";" are comments.
+
+def load_ini(path):
+    sections = {}
+    if not os.path.isfile(path):
+        return sections
+    cur = None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line[0] in '#;':
+                continue
+            if line[0] == '[' and line[-1] == ']':
+                cur = sections.setdefault(line[1:-1].strip(), {})
+                continue
+            # Split at the first delimiter, whichever it is
+            i = min((j for j in (line.find('='), line.find(':')) if j >= 0), default=-1)
+            if cur is None or i < 0:
+                print("Invalid .ini line '{}' ignored".format(line))
+                continue
+            cur[line[:i].strip().lower()] = line[i+1:].strip()
+    return sections
+
 ####################################################################################
 #  Command-line processing: Create the command parser & parse cmd line into 'config'
 
 def set_ini_cli_params(config, params):
     # Set parameters from values stored in config[]
+    #   (keys are lowercase, hence 'degc')
     def set_params():
-        if 'Server' in config.sections():
-            if 'host' in config['Server']:
-                params.host = config['Server']['host']
-            if 'port' in config['Server']:
-                if config['Server']['port'].isnumeric():
-                    params.port = config.getint('Server','port')
-                else:
-                    print("Invalid .ini port '{}' assignment ignored".format(config['Server']['port']))
-            if 'topic' in config['Server']:
-                params.topic = config['Server']['topic']
-            if 'username' in config['Server']:
-                params.username = config['Server']['username']
-            if 'password' in config['Server']:
-                params.password = config['Server']['password']
-        if 'Locale' in config.sections():
-            if 'degC' in config['Locale']:
-                params.degC = config.getboolean('Locale','degC')
+        srv = config.get('Server', {})
+        if 'port' in srv:
+            if srv['port'].isnumeric():
+                params.port = int(srv['port'])
+            else:
+                print("Invalid .ini port '{}' assignment ignored".format(srv['port']))
+        params.host     = srv.get('host', params.host)
+        params.topic    = srv.get('topic', params.topic)
+        params.username = srv.get('username', params.username)
+        params.password = srv.get('password', params.password)
+        loc = config.get('Locale', {})
+        if 'degc' in loc:
+            if loc['degc'].lower() in BOOLEAN_STATES:
+                params.degC = BOOLEAN_STATES[loc['degc'].lower()]
+            else:
+                print("Invalid .ini degC '{}' assignment ignored".format(loc['degc']))
         return
 
     # Start by processing the command line and adding settings into config[]
@@ -53,7 +86,7 @@ def set_ini_cli_params(config, params):
     parser.add_argument("-P", "--port", dest="port", type=str,
                         help="MQTT port #")
     parser.add_argument("-T", "--topic", dest="topic", type=str,
-                        help="rtl_433 MQTT event topic to subscribe to")
+                        help="rtl_433 MQTT event topic(s) to subscribe to, comma-separated")
     parser.add_argument("-c", "--config", dest="config", type=str,
                         help="Specify path & filename to configuration file")
     specifyTemp = parser.add_mutually_exclusive_group()
@@ -99,13 +132,14 @@ def set_ini_cli_params(config, params):
         
     if params.debug:
         print("\nProcessing .ini file", filename)
-    config.read(filename)
+    for section, options in load_ini(filename).items():
+        config.setdefault(section, {}).update(options)
     if params.debug:
         print("\nHere are the parameters seen in .ini and DEFAULTS")
-        for section in config.sections():
+        for section, options in config.items():
             print("\nSection ", section)
-            for option in config.options(section):
-                print("\t", option, " : ", config[section][option])
+            for option, value in options.items():
+                print("\t", option, " : ", value)
 
     # Set parameters from .ini values stored in config[]
     set_params()
@@ -117,23 +151,20 @@ def set_ini_cli_params(config, params):
 
 #   Now process cli parameters back into config[]
 #   May overwrite .ini entries into config[]
-    if args.host and 'Server' in config.sections():
-        if 'host' in config['Server']:
-            config['Server']['host'] = args.host 
-    if args.port and 'Server' in config.sections():
-        if 'port' in config['Server']:
-            config['Server']['port'] = args.port
-    if args.topic and 'Server' in config.sections():
-        if 'topic' in config['Server']:
-            config['Server']['topic'] = args.topic
-    if 'Locale' in config.sections():
-        config['Locale']['degC'] = "true" if args.degC is not None and args.degC else "false"
-    if args.username and 'Server' in config.sections():
-        if 'username' in config['Server']:
-            config['Server']['username'] = args.username
-    if args.password and 'Server' in config.sections():
-        if 'password' in config['Server']:
-            config['Server']['password'] = args.password
+    srv = config.get('Server')
+    if srv is not None:
+        if args.host and 'host' in srv:
+            srv['host'] = args.host 
+        if args.port and 'port' in srv:
+            srv['port'] = args.port
+        if args.topic and 'topic' in srv:
+            srv['topic'] = args.topic
+        if args.username and 'username' in srv:
+            srv['username'] = args.username
+        if args.password and 'password' in srv:
+            srv['password'] = args.password
+    if 'Locale' in config:
+        config['Locale']['degc'] = "true" if args.degC is not None and args.degC else "false"
 
     # And finally, set parameters after they may have been changed by the
     #   command line options
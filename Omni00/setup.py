@@ -0,0 +1,17 @@
+"""
+   Optional: compile Omni00Core.py into a C extension with mypyc
+   for faster per-message decoding.
+
+       pip3 install mypy
+       python3 setup.py build_ext --inplace
+
+   Omni00.py runs unchanged, with or without the compiled module.
+"""
+
+from setuptools import setup
+from mypyc.build import mypycify
+
+setup(
+    name="Omni00Core",
+    ext_modules=mypycify(["Omni00Core.py"]),
+)